@@ -0,0 +1,173 @@
+import os
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+PROCESSED_DIR = os.path.join(PROJECT_ROOT, "data", "processed")
+
+METRICS = ["cost", "calories", "protein"]
+
+DEFAULT_STORE = "Walmart"
+
+# Most baskets whose trajectories are kept; least recently used go first
+CACHE_SIZE = 4096
+
+# basket hash -> metric x date array, in least recently used order
+_RESULT_CACHE = OrderedDict()
+
+
+def load_matrices(path=None):
+    """
+    Build item x date matrices of per-package cost, calories and protein from
+    item_nutrition_cost.csv.
+
+    The item axis is (basket_type, item_name, store), since an item listed
+    under several basket types, or sold at several stores, is priced
+    separately in each. Package grams are recovered as
+    price / price_per_100g * 100. Missing values become 0, so a basket total
+    skips them the same way SUM does in basket_daily_metrics.
+
+    Matrices are cached per file modification time and shared between
+    callers; treat them as read only.
+    """
+    path = path or os.path.join(PROCESSED_DIR, "item_nutrition_cost.csv")
+    return _load_matrices(path, os.stat(path).st_mtime_ns)
+
+
+@lru_cache(maxsize=2)
+def _load_matrices(path, mtime_ns):
+    df = pd.read_csv(path)
+
+    grams = df["price"] / df["price_per_100g"] * 100.0
+    df["cost"] = df["price"]
+    df["calories"] = df["calories_per_100g"] * grams / 100.0
+    df["protein"] = df["protein_per_100g"] * grams / 100.0
+
+    per_item = df.set_index(["basket_type", "item_name", "store", "date"])[METRICS]
+
+    matrices = {}
+    for metric in METRICS:
+        wide = per_item[metric].unstack("date")
+        matrices[metric] = np.nan_to_num(wide.to_numpy(dtype=float))
+
+    matrices["items"] = list(wide.index)
+    matrices["dates"] = list(wide.columns)
+
+    # cached results are only valid for the same axes and the same values
+    labels = ["/".join(item) for item in matrices["items"]]
+    axes = "|".join(labels) + "#" + "|".join(matrices["dates"])
+    h = hashlib.sha1(axes.encode("utf-8"))
+    for metric in METRICS:
+        h.update(np.ascontiguousarray(matrices[metric]).tobytes())
+    matrices["matrix_key"] = h.hexdigest()
+    return matrices
+
+
+def quantity_matrix(baskets, items):
+    """
+    Align candidate baskets to the item axis.
+
+    `baskets` is either a DataFrame with one row per basket and one column per
+    (basket_type, item_name, store) triple (quantities in packages, see
+    baskets_from_items), or an array already ordered like `items`.
+    """
+    if isinstance(baskets, pd.DataFrame):
+        unknown = set(baskets.columns) - set(items)
+        if unknown:
+            raise ValueError(f"Unknown (basket_type, item_name, store) columns in baskets: {sorted(unknown)}")
+        baskets = baskets.reindex(columns=pd.MultiIndex.from_tuples(items), fill_value=0).fillna(0)
+    q = np.asarray(baskets, dtype=float)
+    if q.ndim == 1:
+        q = q[np.newaxis, :]
+    if q.shape[1] != len(items):
+        raise ValueError(f"Expected {len(items)} item columns, got {q.shape[1]}")
+    return q
+
+
+def basket_hash(quantities, matrix_key):
+    """
+    Stable key for one basket: the matrices' content key plus the quantity
+    vector.
+    """
+    h = hashlib.sha1(matrix_key.encode("utf-8"))
+    h.update(np.ascontiguousarray(quantities, dtype=float).tobytes())
+    return h.hexdigest()
+
+
+def evaluate_baskets(baskets, matrices=None, use_cache=True):
+    """
+    Cost, calorie and protein trajectories for many baskets at once.
+
+    Returns {metric: array of shape (n_baskets, n_dates)} plus 'dates' and
+    'hashes'. Baskets already in the cache are not recomputed; the rest go
+    through one matrix product per metric. The cache holds the CACHE_SIZE
+    most recently used baskets.
+    """
+    matrices = matrices or load_matrices()
+    items = matrices["items"]
+    q = quantity_matrix(baskets, items)
+
+    hashes = [basket_hash(row, matrices["matrix_key"]) for row in q]
+
+    # basket x metric x date; cache entries are one metric x date block
+    out = np.empty((len(hashes), len(METRICS), len(matrices["dates"])))
+    todo = []
+    for i, h in enumerate(hashes):
+        if use_cache and h in _RESULT_CACHE:
+            _RESULT_CACHE.move_to_end(h)
+            out[i] = _RESULT_CACHE[h]
+        else:
+            todo.append(i)
+
+    if todo:
+        out[todo] = np.stack([q[todo] @ matrices[metric] for metric in METRICS], axis=1)
+        for i in todo:
+            _RESULT_CACHE[hashes[i]] = out[i].copy()
+            _RESULT_CACHE.move_to_end(hashes[i])
+        while len(_RESULT_CACHE) > CACHE_SIZE:
+            _RESULT_CACHE.popitem(last=False)
+
+    results = {metric: out[:, k] for k, metric in enumerate(METRICS)}
+    results["dates"] = matrices["dates"]
+    results["hashes"] = hashes
+    return results
+
+
+def clear_cache():
+    _RESULT_CACHE.clear()
+    _load_matrices.cache_clear()
+
+
+def baskets_from_items(basket_items, store=DEFAULT_STORE):
+    """
+    Pivot a basket_items.csv style frame into one quantity row per basket_type,
+    with (basket_type, item_name, store) columns. Rows without a store column
+    are bought at `store`.
+    """
+    if "store" not in basket_items.columns:
+        basket_items = basket_items.assign(store=store)
+    return basket_items.pivot_table(
+        index="basket_type", columns=["basket_type", "item_name", "store"], values="quantity",
+        aggfunc="sum", fill_value=0,
+    )
+
+
+def main():
+    basket_items = pd.read_csv(os.path.join(PROJECT_ROOT, "basket_items.csv"))
+    baskets = baskets_from_items(basket_items)
+
+    results = evaluate_baskets(baskets)
+    latest = results["dates"][-1]
+    for name, cost, cal, protein in zip(
+        baskets.index, results["cost"][:, -1], results["calories"][:, -1], results["protein"][:, -1]
+    ):
+        print(f"{latest} {name}: cost {cost:.2f}, calories {cal:.0f}, protein {protein:.0f} g")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+import os
+import sys
+from datetime import datetime
+
+import duckdb
+import pandas as pd
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+PROCESSED_DIR = os.path.join(PROJECT_ROOT, "data", "processed")
+DB_PATH = os.path.join(PROJECT_ROOT, "cost_of_healthy_diet.duckdb")
+
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src", "cleaning"))
+from build_master_table import current_version, get_offset, set_offset, read_changes  # noqa: E402
+
+# Name under which the loader records the cleaned_prices version it has applied
+CDC_CONSUMER = "duckdb"
+# Consumer that writes item_nutrition_cost.csv; the loader waits for it
+UPSTREAM_CONSUMER = "item_nutrition_cost"
+
+# Processed CSV -> DuckDB table that new months are appended to
+SOURCE_TABLES = {
+    "cleaned_prices": "cleaned_prices.csv",
+    "item_nutrition_cost": "item_nutrition_cost.csv",
+}
+
+
+ITEM_PACKAGE_METRICS_SELECT = """
+SELECT
+    p.date,
+    p.basket_type,
+    p.item_name,
+    p.price                          AS price_per_unit,
+    p.grams_total,                   -- grams in the package
+    p.price_per_100g,
+    n.calories_per_100g,
+    n.protein_per_100g,
+    n.fiber_per_100g,
+    n.sugar_per_100g,
+    n.saturated_fat_per_100g,
+    n.nutrient_density_score,
+    n.cost_per_100_calories,
+    n.cost_per_gram_protein,
+
+    -- calories for one package bought
+    CASE
+        WHEN p.grams_total > 0 AND n.calories_per_100g IS NOT NULL
+        THEN n.calories_per_100g * p.grams_total / 100.0
+        ELSE NULL
+    END AS calories_per_unit,
+
+    -- protein for one package bought
+    CASE
+        WHEN p.grams_total > 0 AND n.protein_per_100g IS NOT NULL
+        THEN n.protein_per_100g * p.grams_total / 100.0
+        ELSE NULL
+    END AS protein_per_unit
+
+FROM cleaned_prices p
+JOIN item_nutrition_cost n
+  ON p.date = n.date
+ AND p.item_name = n.item_name
+ AND p.basket_type = n.basket_type
+"""
+
+BASKET_DAILY_METRICS_SELECT = """
+SELECT
+    m.date,
+    m.basket_type,
+    SUM(b.quantity * m.price_per_unit)    AS basket_total_cost,
+    SUM(b.quantity * m.grams_total)       AS basket_total_grams,
+    SUM(b.quantity * m.calories_per_unit) AS basket_total_calories,
+    SUM(b.quantity * m.protein_per_unit)  AS basket_total_protein,
+    AVG(m.nutrient_density_score)         AS avg_nutrient_density
+FROM item_package_metrics m
+JOIN basket_items b
+  ON m.item_name = b.item_name
+ AND m.basket_type = b.basket_type
+"""
+
+# Restricts a SELECT above to the (date, basket_type) keys touched by a load
+AFFECTED_FILTER = """
+WHERE ({alias}.date, {alias}.basket_type) IN (
+    SELECT date, basket_type FROM affected_keys
+)
+"""
+
+
+def relation_type(con, name):
+    """
+    Return 'BASE TABLE', 'VIEW' or None for a relation in the main schema.
+    """
+    row = con.execute(
+        "SELECT table_type FROM information_schema.tables "
+        "WHERE table_schema = 'main' AND table_name = ?",
+        [name],
+    ).fetchone()
+    return row[0] if row else None
+
+
+def add_missing_columns(con, table, path):
+    """
+    Add columns that appeared in the processed CSV since `table` was created,
+    so INSERT BY NAME keeps working when upstream grows the schema.
+    """
+    existing = {r[0] for r in con.execute(f"DESCRIBE {table}").fetchall()}
+    csv_cols = con.execute(
+        "DESCRIBE SELECT * FROM read_csv(?, header = true)", [path]
+    ).fetchall()
+    for name, col_type, *_ in csv_cols:
+        if name not in existing:
+            con.execute(f'ALTER TABLE {table} ADD COLUMN "{name}" {col_type}')
+            print(f"Added column {name} {col_type} to {table}")
+
+
+def ensure_schema(con):
+    """
+    Create the watermark table and turn item_package_metrics and
+    basket_daily_metrics into materialized tables.
+
+    On a database that still has item_package_metrics as a view, the view is
+    replaced by a table holding the same rows, so the dependent views
+    (item_inflation_contributors, basket_monthly_inflation, ...) keep working
+    unchanged but read precomputed data.
+    """
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS load_watermark (
+            table_name  VARCHAR PRIMARY KEY,
+            max_date    DATE,
+            rows_loaded BIGINT,
+            loaded_at   TIMESTAMP
+        )
+        """
+    )
+
+    for table, filename in SOURCE_TABLES.items():
+        path = os.path.join(PROCESSED_DIR, filename)
+        if relation_type(con, table) is None:
+            con.execute(
+                f"CREATE TABLE {table} AS SELECT * FROM read_csv(?, header = true) LIMIT 0",
+                [path],
+            )
+        add_missing_columns(con, table, path)
+
+    if relation_type(con, "basket_items") is None:
+        path = os.path.join(PROJECT_ROOT, "basket_items.csv")
+        con.execute(
+            "CREATE TABLE basket_items AS SELECT * FROM read_csv(?, header = true)",
+            [path],
+        )
+
+    if relation_type(con, "item_package_metrics") == "VIEW":
+        con.execute(
+            "CREATE TABLE item_package_metrics_mat AS SELECT * FROM item_package_metrics"
+        )
+        con.execute("DROP VIEW item_package_metrics")
+        con.execute("ALTER TABLE item_package_metrics_mat RENAME TO item_package_metrics")
+        print("Materialized item_package_metrics view into a table")
+    elif relation_type(con, "item_package_metrics") is None:
+        con.execute(
+            f"CREATE TABLE item_package_metrics AS {ITEM_PACKAGE_METRICS_SELECT}"
+        )
+
+    if relation_type(con, "basket_daily_metrics") is None:
+        con.execute(
+            f"""
+            CREATE TABLE basket_daily_metrics AS
+            {BASKET_DAILY_METRICS_SELECT}
+            GROUP BY m.date, m.basket_type
+            """
+        )
+
+
+def get_watermark(con, table):
+    """
+    Latest date already loaded into `table`.
+
+    Falls back to the max date in the table itself for databases that were
+    populated before the watermark existed.
+    """
+    row = con.execute(
+        "SELECT max_date FROM load_watermark WHERE table_name = ?", [table]
+    ).fetchone()
+    if row and row[0] is not None:
+        return row[0]
+    return con.execute(f"SELECT MAX(date) FROM {table}").fetchone()[0]
+
+
+def set_watermark(con, table, max_date, rows_loaded):
+    con.execute(
+        "INSERT OR REPLACE INTO load_watermark VALUES (?, ?, ?, ?)",
+        [table, max_date, rows_loaded, datetime.now()],
+    )
+
+
+def stage_changed_keys(con, version):
+    """
+    Register the (date, basket_type) keys touched by cleaned_prices change
+    sets up to `version` not yet applied to DuckDB as temp table
+    changed_keys, so restated past months are reloaded too. Returns False
+    when a change set is missing.
+    """
+    changes = read_changes(get_offset(CDC_CONSUMER), version)
+    ok = changes is not None
+    if not ok:
+        print("Missing cleaned_prices change sets, only loading past the watermark")
+        changes = pd.DataFrame(columns=["date", "basket_type"])
+
+    keys = changes[["date", "basket_type"]].drop_duplicates().astype(str)
+    con.register("changed_keys_df", keys)
+    con.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE changed_keys AS
+        SELECT CAST(date AS DATE) AS date, basket_type FROM changed_keys_df
+        """
+    )
+    con.unregister("changed_keys_df")
+    return ok
+
+
+def stage_new_rows(con, table, filename):
+    """
+    Load rows newer than the watermark of `table`, or under a key in
+    changed_keys, from its processed CSV into a temp table named new_<table>.
+    Returns the number of staged rows.
+    """
+    path = os.path.join(PROCESSED_DIR, filename)
+    watermark = get_watermark(con, table)
+
+    query = f"""
+        CREATE OR REPLACE TEMP TABLE new_{table} AS
+        SELECT * FROM read_csv(?, header = true)
+        WHERE (date, basket_type) IN (SELECT date, basket_type FROM changed_keys)
+    """
+    params = [path]
+    if watermark is not None:
+        query += " OR date > ?"
+        params.append(watermark)
+    else:
+        query += " OR TRUE"
+
+    con.execute(query, params)
+    return con.execute(f"SELECT COUNT(*) FROM new_{table}").fetchone()[0]
+
+
+def refresh_materialized(con):
+    """
+    Recompute item_package_metrics and basket_daily_metrics for the keys in
+    affected_keys only: delete the stale rows, then insert fresh aggregates.
+    """
+    con.execute(
+        f"DELETE FROM item_package_metrics m {AFFECTED_FILTER.format(alias='m')}"
+    )
+    con.execute(
+        f"""
+        INSERT INTO item_package_metrics BY NAME
+        {ITEM_PACKAGE_METRICS_SELECT}
+        {AFFECTED_FILTER.format(alias='p')}
+        """
+    )
+
+    con.execute(
+        f"DELETE FROM basket_daily_metrics d {AFFECTED_FILTER.format(alias='d')}"
+    )
+    con.execute(
+        f"""
+        INSERT INTO basket_daily_metrics BY NAME
+        {BASKET_DAILY_METRICS_SELECT}
+        {AFFECTED_FILTER.format(alias='m')}
+        GROUP BY m.date, m.basket_type
+        """
+    )
+
+
+def load_incremental(con):
+    """
+    Append new months from the processed CSVs and refresh the materialized
+    aggregates for the affected (date, basket_type) keys.
+
+    Returns the number of affected keys (0 when everything is up to date or
+    item_nutrition_cost.csv is behind cleaned_prices.csv).
+    """
+    # Both CSVs are only read at their current state, so loading while the
+    # nutrition table lags would pair new prices with stale nutrition rows
+    version = current_version()
+    upstream = get_offset(UPSTREAM_CONSUMER)
+    if upstream < version:
+        print(
+            f"item_nutrition_cost is at cleaned prices version {upstream} of {version}, "
+            "run build_nutrition_cost_table.py first"
+        )
+        return 0
+
+    ensure_schema(con)
+    cdc_ok = stage_changed_keys(con, version)
+    n_changed = con.execute("SELECT COUNT(*) FROM changed_keys").fetchone()[0]
+
+    staged = {}
+    for table, filename in SOURCE_TABLES.items():
+        staged[table] = stage_new_rows(con, table, filename)
+        print(f"{table}: {staged[table]} new rows")
+
+    if not any(staged.values()) and not n_changed:
+        print("DuckDB is up to date, nothing to load")
+        if cdc_ok:
+            set_offset(CDC_CONSUMER, version)
+        return 0
+
+    con.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE affected_keys AS
+        SELECT DISTINCT date, basket_type FROM new_cleaned_prices
+        UNION
+        SELECT DISTINCT date, basket_type FROM new_item_nutrition_cost
+        UNION
+        SELECT date, basket_type FROM changed_keys
+        """
+    )
+    n_keys = con.execute("SELECT COUNT(*) FROM affected_keys").fetchone()[0]
+
+    con.begin()
+    try:
+        for table in SOURCE_TABLES:
+            # Replace, do not duplicate, reloaded keys; keys deleted upstream
+            # have no staged rows and simply disappear
+            con.execute(
+                f"""
+                DELETE FROM {table}
+                WHERE (date, basket_type) IN (SELECT date, basket_type FROM affected_keys)
+                """
+            )
+            con.execute(f"INSERT INTO {table} BY NAME SELECT * FROM new_{table}")
+
+        refresh_materialized(con)
+
+        for table in SOURCE_TABLES:
+            max_date = con.execute(f"SELECT MAX(date) FROM {table}").fetchone()[0]
+            set_watermark(con, table, max_date, staged[table])
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+
+    if cdc_ok:
+        set_offset(CDC_CONSUMER, version)
+
+    print(f"Refreshed materialized metrics for {n_keys} (date, basket_type) keys")
+    return n_keys
+
+
+def main():
+    con = duckdb.connect(DB_PATH)
+    try:
+        load_incremental(con)
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
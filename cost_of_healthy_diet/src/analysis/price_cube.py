@@ -0,0 +1,215 @@
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+PROCESSED_DIR = os.path.join(PROJECT_ROOT, "data", "processed")
+CUBE_DIR = os.path.join(PROCESSED_DIR, "price_cube")
+
+# One raw memory-mapped file per field, laid out as date x item x store.
+# Dates are the outer axis so a new month is appended to the end of each file.
+FIELDS = {
+    "price": np.float64,
+    "price_per_100g": np.float64,
+    "available": np.bool_,
+}
+
+
+def _meta_path(cube_dir):
+    return os.path.join(cube_dir, "axes.json")
+
+
+def _field_path(cube_dir, field):
+    return os.path.join(cube_dir, f"{field}.dat")
+
+
+def _fill_slab(df, dates, items, stores):
+    """
+    Build dense in-memory arrays for the rows in `df` over the given axes.
+    """
+    shape = (len(dates), len(items), len(stores))
+    slab = {
+        "price": np.full(shape, np.nan),
+        "price_per_100g": np.full(shape, np.nan),
+        "available": np.zeros(shape, dtype=np.bool_),
+    }
+
+    date_idx = {d: i for i, d in enumerate(dates)}
+    item_idx = {n: i for i, n in enumerate(items)}
+    store_idx = {s: i for i, s in enumerate(stores)}
+
+    d = df["date"].map(date_idx).to_numpy()
+    i = df["item_name"].map(item_idx).to_numpy()
+    s = df["store"].map(store_idx).to_numpy()
+
+    slab["price"][d, i, s] = df["price"].to_numpy(dtype=float)
+    slab["price_per_100g"][d, i, s] = df["price_per_100g"].to_numpy(dtype=float)
+    slab["available"][d, i, s] = df["price"].notna().to_numpy()
+    return slab
+
+
+def _write_dates(cube, df, dates, only_changed=False):
+    """
+    Fill the memory-mapped `cube` one date slab at a time, so only a single
+    item x store slab is ever held in memory.
+
+    With only_changed, slabs equal to what is already on disk are skipped.
+    Returns the dates that were written.
+    """
+    by_date = dict(tuple(df.groupby("date")))
+    written = []
+    for date in dates:
+        pos = cube["date_index"][date]
+        rows = by_date.get(date, df.iloc[0:0])
+        slab = _fill_slab(rows, [date], cube["items"], cube["stores"])
+        if only_changed and all(
+            np.array_equal(cube[field][pos], slab[field][0], equal_nan=(field != "available"))
+            for field in FIELDS
+        ):
+            continue
+        for field in FIELDS:
+            cube[field][pos] = slab[field][0]
+        written.append(date)
+
+    for field in FIELDS:
+        cube[field].flush()
+    return written
+
+
+def _prepare(df):
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+    # one observation per cell; an item listed in several baskets keeps the last row
+    return df.drop_duplicates(["date", "item_name", "store"], keep="last")
+
+
+def _write_meta(cube_dir, dates, items, stores):
+    with open(_meta_path(cube_dir), "w", encoding="utf-8") as f:
+        json.dump({"dates": dates, "items": items, "stores": stores}, f, indent=2)
+
+
+def build_cube(df, cube_dir=CUBE_DIR):
+    """
+    Write a fresh cube from a cleaned prices table.
+
+    The field files are created at full size as memory maps and filled one
+    date at a time.
+    """
+    os.makedirs(cube_dir, exist_ok=True)
+    df = _prepare(df)
+
+    dates = sorted(df["date"].unique())
+    items = sorted(df["item_name"].unique())
+    stores = sorted(df["store"].unique())
+
+    _write_meta(cube_dir, dates, items, stores)
+    cube = load_cube(cube_dir, mode="w+")
+    _write_dates(cube, df, dates)
+
+    print(f"Built price cube {len(dates)} x {len(items)} x {len(stores)} in {cube_dir}")
+
+
+def extend_cube(df, cube_dir=CUBE_DIR):
+    """
+    Bring the cube in line with a cleaned prices table in place.
+
+    Dates already in the cube are compared slab by slab and restated ones are
+    rewritten where they sit; dates newer than the last cube date are
+    appended. Falls back to a full rebuild whenever an axis changes: items
+    or stores the cube has no slot for, a date that falls before the last
+    cube date (e.g. a backfilled month), or a cube date no longer present.
+    """
+    with open(_meta_path(cube_dir), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    df = _prepare(df)
+    known = set(meta["dates"])
+    dates = set(df["date"])
+    inserted = {d for d in dates - known if d < meta["dates"][-1]}
+    removed = known - dates
+    unknown_items = set(df["item_name"]) - set(meta["items"])
+    unknown_stores = set(df["store"]) - set(meta["stores"])
+    if unknown_items or unknown_stores or inserted or removed:
+        print(
+            f"Cube axes changed ({len(unknown_items)} new items, {len(unknown_stores)} new stores, "
+            f"{len(inserted)} inserted dates, {len(removed)} removed dates), rebuilding price cube"
+        )
+        build_cube(df, cube_dir)
+        return
+
+    restated = sorted(meta["dates"])
+    new_dates = sorted(dates - known)
+
+    cube = load_cube(cube_dir, mode="r+")
+    rewritten = _write_dates(cube, df, restated, only_changed=True)
+    del cube
+
+    if new_dates:
+        # grow each field file by the new date slabs, then fill them in place
+        meta["dates"].extend(new_dates)
+        slab_cells = len(meta["items"]) * len(meta["stores"])
+        for field, dtype in FIELDS.items():
+            with open(_field_path(cube_dir, field), "r+b") as f:
+                f.truncate(len(meta["dates"]) * slab_cells * np.dtype(dtype).itemsize)
+        _write_meta(cube_dir, meta["dates"], meta["items"], meta["stores"])
+        cube = load_cube(cube_dir, mode="r+")
+        _write_dates(cube, df, new_dates)
+        del cube
+
+    if not rewritten and not new_dates:
+        print("Price cube is up to date")
+        return
+    print(f"Rewrote {len(rewritten)} restated dates and appended {len(new_dates)} dates to price cube")
+
+
+def load_cube(cube_dir=CUBE_DIR, mode="r"):
+    """
+    Open the cube as memory-mapped arrays. Nothing is read until sliced.
+
+    Returns a dict with the arrays under their field names, the axis labels
+    under 'dates', 'items' and 'stores', and label -> position lookups under
+    'date_index', 'item_index' and 'store_index'.
+    """
+    with open(_meta_path(cube_dir), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    shape = (len(meta["dates"]), len(meta["items"]), len(meta["stores"]))
+    cube = {
+        field: np.memmap(_field_path(cube_dir, field), dtype=dtype, mode=mode, shape=shape)
+        for field, dtype in FIELDS.items()
+    }
+    for axis in ("dates", "items", "stores"):
+        cube[axis] = meta[axis]
+        cube[axis[:-1] + "_index"] = {label: i for i, label in enumerate(meta[axis])}
+    return cube
+
+
+def item_history(cube, item_name, store="Walmart", field="price"):
+    """
+    Zero copy view of one item's series over all dates at one store.
+    """
+    return cube[field][:, cube["item_index"][item_name], cube["store_index"][store]]
+
+
+def store_snapshot(cube, date, field="price"):
+    """
+    Zero copy item x store view for a single date.
+    """
+    return cube[field][cube["date_index"][date]]
+
+
+def main():
+    cleaned_path = os.path.join(PROCESSED_DIR, "cleaned_prices.csv")
+    df = pd.read_csv(cleaned_path)
+
+    if os.path.exists(_meta_path(CUBE_DIR)):
+        extend_cube(df)
+    else:
+        build_cube(df)
+
+
+if __name__ == "__main__":
+    main()
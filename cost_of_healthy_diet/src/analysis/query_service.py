@@ -0,0 +1,214 @@
+import os
+import json
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+PROCESSED_DIR = os.path.join(PROJECT_ROOT, "data", "processed")
+
+SOURCES = {
+    "basket_metrics": "basket_metrics.csv",
+    "item_inflation": "item_inflation.csv",
+    "item_nutrition_cost": "item_nutrition_cost.csv",
+}
+
+# Sorted index per source so range lookups are slices, not scans
+INDEXES = {
+    "basket_metrics": ["basket_type", "date"],
+    "item_inflation": ["item_name", "date"],
+    "item_nutrition_cost": ["date", "cost_per_gram_protein"],
+}
+
+DEFAULT_PAGE_SIZE = 100
+CACHE_SIZE = 1024
+HOST = "127.0.0.1"
+PORT = 8050
+
+# generation -> {source: frame}; the previous generation is kept so queries
+# that started before a reload can finish against the frames they began with
+_FRAMES = {}
+_MTIMES = {}
+_GENERATION = 0
+_LOAD_LOCK = threading.Lock()
+
+
+def source_mtimes():
+    return {
+        name: os.stat(os.path.join(PROCESSED_DIR, fname)).st_mtime_ns
+        for name, fname in SOURCES.items()
+    }
+
+
+def _load_frames_locked():
+    global _GENERATION
+    mtimes = source_mtimes()
+    frames = {}
+    for name, fname in SOURCES.items():
+        df = pd.read_csv(os.path.join(PROCESSED_DIR, fname))
+        frames[name] = df.sort_values(INDEXES[name]).set_index(INDEXES[name][0])
+
+    generation = _GENERATION + 1
+    _FRAMES[generation] = frames
+    _FRAMES.pop(generation - 2, None)
+    _MTIMES.clear()
+    _MTIMES.update(mtimes)
+    _GENERATION = generation
+
+    for fn in CACHED_QUERIES:
+        fn.cache_clear()
+    return generation
+
+
+def load_frames():
+    """
+    (Re)load every processed output under a new generation and clear cached
+    results. Returns the new generation.
+    """
+    with _LOAD_LOCK:
+        return _load_frames_locked()
+
+
+def ensure_fresh():
+    """
+    Reload when the pipeline has published new outputs since the last load.
+    Costs one stat() per source file. Returns the generation to query.
+    """
+    with _LOAD_LOCK:
+        if not _GENERATION or source_mtimes() != _MTIMES:
+            return _load_frames_locked()
+        return _GENERATION
+
+
+def paginate(df, page, page_size):
+    if page < 1 or page_size < 1:
+        raise ValueError("page and page_size must be positive")
+    total = len(df)
+    start = (page - 1) * page_size
+    chunk = df.iloc[start:start + page_size]
+    # NaN is not valid JSON
+    records = chunk.replace({np.nan: None}).to_dict(orient="records")
+    return {"page": page, "page_size": page_size, "total": total, "rows": records}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _basket_cost(generation, basket_type, start, end, page, page_size):
+    df = _FRAMES[generation]["basket_metrics"]
+    if basket_type not in df.index:
+        return paginate(df.iloc[0:0].reset_index(), page, page_size)
+
+    rows = df.loc[[basket_type]]
+    dates = rows["date"].to_numpy()
+    lo = np.searchsorted(dates, start, side="left") if start else 0
+    hi = np.searchsorted(dates, end, side="right") if end else len(dates)
+    return paginate(rows.iloc[lo:hi].reset_index(), page, page_size)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _item_trend(generation, item_name, basket_type, page, page_size):
+    df = _FRAMES[generation]["item_inflation"]
+    if item_name not in df.index:
+        return paginate(df.iloc[0:0].reset_index(), page, page_size)
+
+    rows = df.loc[[item_name]].reset_index()
+    if basket_type:
+        rows = rows[rows["basket_type"] == basket_type]
+    return paginate(rows, page, page_size)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cheapest_protein(generation, date, basket_type, page, page_size):
+    df = _FRAMES[generation]["item_nutrition_cost"]
+    if date is None:
+        date = df.index.max()
+    if date not in df.index:
+        return paginate(df.iloc[0:0].reset_index(), page, page_size)
+
+    # rows within a date are already sorted by cost_per_gram_protein
+    rows = df.loc[[date]].reset_index()
+    rows = rows[rows["cost_per_gram_protein"].notna()]
+    if basket_type:
+        rows = rows[rows["basket_type"] == basket_type]
+    return paginate(rows, page, page_size)
+
+
+CACHED_QUERIES = [_basket_cost, _item_trend, _cheapest_protein]
+
+
+def basket_cost(basket_type, start=None, end=None, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Basket metrics for one basket_type between two ISO dates (inclusive).
+
+    Results are shared between callers through the cache; treat them as
+    read only.
+    """
+    generation = ensure_fresh()
+    return _basket_cost(generation, basket_type, start, end, page, page_size)
+
+
+def item_trend(item_name, basket_type=None, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Month over month cost changes for one item, oldest first.
+    """
+    generation = ensure_fresh()
+    return _item_trend(generation, item_name, basket_type, page, page_size)
+
+
+def cheapest_protein(date=None, basket_type=None, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Items ranked by cost_per_gram_protein on a date (latest date by default).
+    """
+    generation = ensure_fresh()
+    return _cheapest_protein(generation, date, basket_type, page, page_size)
+
+
+ENDPOINTS = {
+    "/basket_cost": (basket_cost, ["basket_type", "start", "end"]),
+    "/item_trend": (item_trend, ["item_name", "basket_type"]),
+    "/cheapest_protein": (cheapest_protein, ["date", "basket_type"]),
+}
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path not in ENDPOINTS:
+            self.send_json(404, {"error": f"unknown endpoint {url.path}"})
+            return
+
+        fn, arg_names = ENDPOINTS[url.path]
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        kwargs = {k: query[k] for k in arg_names if k in query}
+        try:
+            kwargs["page"] = int(query.get("page", 1))
+            kwargs["page_size"] = int(query.get("page_size", DEFAULT_PAGE_SIZE))
+            result = fn(**kwargs)
+        except (TypeError, ValueError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+
+        self.send_json(200, result)
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    load_frames()
+    server = ThreadingHTTPServer((HOST, PORT), QueryHandler)
+    print(f"Serving basket metrics on http://{HOST}:{PORT} ({', '.join(ENDPOINTS)})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Sharded backfill executor.
+
+Work is split into shards (one month, or one month x store) recorded in a
+SQLite queue under data/interim. Any number of workers, on this machine or on
+others sharing the project directory, claim pending shards, write one output
+file per shard and mark the shard done. A final merge step assembles the
+shard outputs into the usual pipeline files.
+
+    python src/backfill/backfill.py enqueue standardize
+    python src/backfill/backfill.py work standardize --processes 4
+    python src/backfill/backfill.py merge standardize
+
+A failed shard, or one whose worker died, is retried automatically until
+it has been attempted MAX_ATTEMPTS times. `reset <job> --failed` puts only the failed shards back to
+pending with a fresh attempt count; `reset <job>` does the same for every
+shard of a job, e.g. after a fix to parse_unit_size.
+
+Shards are idempotent: outputs are written to a temp file and renamed into
+place, so a shard whose worker died can be re-claimed after LEASE_SECONDS and
+simply run again.
+"""
+import os
+import sys
+import time
+import shutil
+import socket
+import sqlite3
+import argparse
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+RAW_DIR = os.path.join(PROJECT_ROOT, "data", "raw")
+INTERIM_DIR = os.path.join(PROJECT_ROOT, "data", "interim")
+QUEUE_PATH = os.path.join(INTERIM_DIR, "backfill_queue.sqlite")
+SHARD_DIR = os.path.join(INTERIM_DIR, "backfill")
+
+# Stage scripts import their siblings by module name, so put each stage on the path
+for stage in ("cleaning", "scraping"):
+    sys.path.insert(0, os.path.join(PROJECT_ROOT, "src", stage))
+from standardize_units import standardize  # noqa: E402
+from price_sketch import SKETCH_PATH, build_sketches, merge_sketch_frames  # noqa: E402
+from simulate_multiyear import simulate_month  # noqa: E402
+
+# A claimed shard not finished within this time is handed to another worker
+LEASE_SECONDS = 15 * 60
+
+# A failed shard is handed out again until it has been tried this many times
+MAX_ATTEMPTS = 3
+
+JOBS = ("standardize", "simulate")
+
+
+def connect(queue_path=QUEUE_PATH):
+    os.makedirs(os.path.dirname(queue_path), exist_ok=True)
+    con = sqlite3.connect(queue_path, timeout=60, isolation_level=None)
+    con.execute("PRAGMA journal_mode=DELETE")  # WAL is unsafe on network filesystems
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS shards (
+            job         TEXT NOT NULL,
+            shard_id    TEXT NOT NULL,
+            month       TEXT NOT NULL,
+            store       TEXT,
+            params      TEXT,
+            status      TEXT NOT NULL DEFAULT 'pending',
+            worker      TEXT,
+            attempts    INTEGER NOT NULL DEFAULT 0,
+            claimed_at  REAL,
+            finished_at REAL,
+            error       TEXT,
+            PRIMARY KEY (job, shard_id)
+        )
+        """
+    )
+    return con
+
+
+def shard_output_path(job, shard_id, suffix=""):
+    return os.path.join(SHARD_DIR, job, f"{shard_id}{suffix}.csv")
+
+
+def raw_files():
+    return sorted(
+        f for f in os.listdir(RAW_DIR)
+        if f.startswith("raw_prices_") and f.endswith(".csv")
+    )
+
+
+def enqueue_standardize(con):
+    """
+    One shard per (raw file, store).
+    """
+    shards = []
+    for fname in raw_files():
+        month = fname[len("raw_prices_"):-len(".csv")]
+        stores = pd.read_csv(os.path.join(RAW_DIR, fname), usecols=["store"])["store"]
+        for store in sorted(stores.dropna().unique()):
+            shard_id = f"{month}_{store}".replace(" ", "_").replace("/", "_")
+            shards.append(("standardize", shard_id, month, store, fname))
+    return insert_shards(con, shards)
+
+
+def enqueue_simulate(con, start_year=2020, end_year=2025, seed=0):
+    """
+    One shard per simulated month. The seed is stored per shard so re-running
+    a shard reproduces the same file.
+    """
+    shards = []
+    for year in range(start_year, end_year + 1):
+        for month in range(1, 13):
+            key = f"{year}{month:02d}"
+            params = f"{end_year},{seed}"
+            shards.append(("simulate", key, key, None, params))
+    return insert_shards(con, shards)
+
+
+def insert_shards(con, shards):
+    before = con.total_changes
+    con.executemany(
+        "INSERT OR IGNORE INTO shards (job, shard_id, month, store, params) "
+        "VALUES (?, ?, ?, ?, ?)",
+        shards,
+    )
+    return con.total_changes - before
+
+
+def claim_shard(con, job, worker):
+    """
+    Atomically claim one pending, lease-expired or retryable failed shard.
+    Returns the row or None when nothing is left to do.
+
+    Lease-expired shards count against MAX_ATTEMPTS like failed ones, so a
+    shard that keeps killing its worker (e.g. out of memory) is marked
+    failed instead of being handed out forever.
+    """
+    now = time.time()
+    expired = now - LEASE_SECONDS
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        con.execute(
+            """
+            UPDATE shards
+            SET status = 'failed', finished_at = ?,
+                error = 'lease expired on the last attempt, worker presumed dead'
+            WHERE job = ? AND status = 'claimed' AND claimed_at < ? AND attempts >= ?
+            """,
+            [now, job, expired, MAX_ATTEMPTS],
+        )
+        row = con.execute(
+            """
+            SELECT shard_id, month, store, params FROM shards
+            WHERE job = ?
+              AND (status = 'pending'
+                   OR (status IN ('claimed', 'failed') AND attempts < ?
+                       AND (status = 'failed' OR claimed_at < ?)))
+            ORDER BY status = 'failed', month, shard_id
+            LIMIT 1
+            """,
+            [job, MAX_ATTEMPTS, expired],
+        ).fetchone()
+        if row is not None:
+            con.execute(
+                """
+                UPDATE shards
+                SET status = 'claimed', worker = ?, claimed_at = ?,
+                    attempts = attempts + 1, error = NULL
+                WHERE job = ? AND shard_id = ?
+                """,
+                [worker, now, job, row[0]],
+            )
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    return row
+
+
+def finish_shard(con, job, shard_id, worker, error=None):
+    """
+    Mark a shard done (or failed). Ignored if the lease was lost to another
+    worker in the meantime.
+    """
+    con.execute(
+        """
+        UPDATE shards
+        SET status = ?, finished_at = ?, error = ?
+        WHERE job = ? AND shard_id = ? AND worker = ?
+        """,
+        ["failed" if error else "done", time.time(), error, job, shard_id, worker],
+    )
+
+
+def write_atomic(df, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def run_standardize_shard(shard_id, month, store, fname):
+    df = pd.read_csv(os.path.join(RAW_DIR, fname))
+    df = df[df["store"] == store]
+    df["source_file"] = fname
+    df = standardize(df)
+    write_atomic(df, shard_output_path("standardize", shard_id))
+    write_atomic(build_sketches(df), shard_output_path("standardize", shard_id, "_sketches"))
+
+
+def run_simulate_shard(shard_id, month, store, params):
+    end_year, seed = (int(p) for p in params.split(","))
+    baseline = pd.read_csv(os.path.join(RAW_DIR, "raw_prices_20250101.csv"))
+    rng = np.random.default_rng([seed, int(month)])
+    month_df = simulate_month(
+        baseline, int(month[:4]), int(month[4:]), end_year=end_year, rng=rng
+    )
+    write_atomic(month_df, shard_output_path("simulate", shard_id))
+
+
+SHARD_RUNNERS = {
+    "standardize": run_standardize_shard,
+    "simulate": run_simulate_shard,
+}
+
+
+def work(job, queue_path=QUEUE_PATH):
+    """
+    Claim and run shards until the queue for `job` is drained. Returns the
+    number of shards this worker completed.
+    """
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    con = connect(queue_path)
+    done = 0
+
+    while True:
+        row = claim_shard(con, job, worker)
+        if row is None:
+            break
+
+        shard_id, month, store, params = row
+        try:
+            SHARD_RUNNERS[job](shard_id, month, store, params)
+        except Exception as e:
+            print(f"[{worker}] shard {shard_id} failed: {e}")
+            finish_shard(con, job, shard_id, worker, error=str(e))
+            continue
+
+        finish_shard(con, job, shard_id, worker)
+        done += 1
+
+    con.close()
+    print(f"[{worker}] finished {done} {job} shards")
+    return done
+
+
+def reset_shards(con, job, failed_only=False):
+    """
+    Put shards of `job` back to pending with a fresh attempt count, either
+    all of them or only the failed ones. Returns the number of shards reset.
+    """
+    query = (
+        "UPDATE shards SET status = 'pending', worker = NULL, error = NULL, attempts = 0 "
+        "WHERE job = ?"
+    )
+    if failed_only:
+        query += " AND status = 'failed'"
+    return con.execute(query, [job]).rowcount
+
+
+def shard_status(con, job):
+    rows = con.execute(
+        "SELECT status, COUNT(*) FROM shards WHERE job = ? GROUP BY status", [job]
+    ).fetchall()
+    return dict(rows)
+
+
+def merge(con, job):
+    """
+    Assemble shard outputs once every shard of `job` is done.
+    """
+    status = shard_status(con, job)
+    pending = sum(n for s, n in status.items() if s != "done")
+    if pending:
+        raise RuntimeError(f"{pending} {job} shards are not done yet: {status}")
+
+    shard_ids = [
+        r[0] for r in con.execute(
+            "SELECT shard_id FROM shards WHERE job = ? ORDER BY month, shard_id", [job]
+        )
+    ]
+
+    if job == "standardize":
+        frames = [pd.read_csv(shard_output_path(job, s)) for s in shard_ids]
+        out_path = os.path.join(INTERIM_DIR, "standardized_prices.csv")
+        write_atomic(pd.concat(frames, ignore_index=True), out_path)
+        print(f"Merged {len(frames)} shards into {out_path}")
+
+        sketches = [pd.read_csv(shard_output_path(job, s, "_sketches")) for s in shard_ids]
+        write_atomic(merge_sketch_frames(*sketches), SKETCH_PATH)
+        print(f"Merged shard price sketches into {SKETCH_PATH}")
+    elif job == "simulate":
+        for s in shard_ids:
+            shutil.copyfile(
+                shard_output_path(job, s),
+                os.path.join(RAW_DIR, f"raw_prices_{s}.csv"),
+            )
+        print(f"Copied {len(shard_ids)} simulated months into {RAW_DIR}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded backfill executor")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("enqueue")
+    p.add_argument("job", choices=JOBS)
+    p.add_argument("--start-year", type=int, default=2020)
+    p.add_argument("--end-year", type=int, default=2025)
+    p.add_argument("--seed", type=int, default=0)
+
+    p = sub.add_parser("work")
+    p.add_argument("job", choices=JOBS)
+    p.add_argument("--processes", type=int, default=1)
+
+    p = sub.add_parser("merge")
+    p.add_argument("job", choices=JOBS)
+
+    p = sub.add_parser("reset")
+    p.add_argument("job", choices=JOBS)
+    p.add_argument("--failed", action="store_true", help="only reset failed shards")
+
+    p = sub.add_parser("status")
+    p.add_argument("job", choices=JOBS)
+
+    args = parser.parse_args()
+
+    if args.command == "work":
+        if args.processes > 1:
+            with Pool(args.processes) as pool:
+                pool.map(work, [args.job] * args.processes)
+        else:
+            work(args.job)
+        return
+
+    con = connect()
+    if args.command == "enqueue":
+        if args.job == "standardize":
+            n = enqueue_standardize(con)
+        else:
+            n = enqueue_simulate(con, args.start_year, args.end_year, args.seed)
+        print(f"Enqueued {n} new {args.job} shards")
+    elif args.command == "merge":
+        merge(con, args.job)
+    elif args.command == "reset":
+        n = reset_shards(con, args.job, failed_only=args.failed)
+        print(f"Reset {n} {'failed ' if args.failed else ''}{args.job} shards to pending")
+    elif args.command == "status":
+        print(shard_status(con, args.job))
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
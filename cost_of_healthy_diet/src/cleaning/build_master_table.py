@@ -1,4 +1,8 @@
 import os
+import json
+from datetime import datetime
+
+import numpy as np
 import pandas as pd
 
 
@@ -6,16 +10,175 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 INTERIM_DIR = os.path.join(PROJECT_ROOT, "data", "interim")
 PROCESSED_DIR = os.path.join(PROJECT_ROOT, "data", "processed")
 
+# Change sets published on every run that alters cleaned_prices.csv
+CHANGES_DIR = os.path.join(PROCESSED_DIR, "changes")
+VERSION_PATH = os.path.join(PROCESSED_DIR, "cleaned_prices_version.json")
+# Last change set version each downstream consumer has applied
+OFFSETS_PATH = os.path.join(PROCESSED_DIR, "cdc_offsets.json")
+
+# Row identity; basket_type is needed because an item can sit in several baskets
+KEY_COLS = ["date", "basket_type", "store", "item_name"]
+
+FLOAT_RTOL = 1e-12
+
+
+def _read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _write_csv(df, path):
+    tmp_path = f"{path}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def current_version():
+    return _read_json(VERSION_PATH, {"version": 0})["version"]
+
+
+def get_offset(consumer):
+    return _read_json(OFFSETS_PATH, {}).get(consumer, 0)
+
+
+def set_offset(consumer, version):
+    offsets = _read_json(OFFSETS_PATH, {})
+    offsets[consumer] = version
+    _write_json(OFFSETS_PATH, offsets)
+
+
+def change_set_path(version):
+    return os.path.join(CHANGES_DIR, f"cleaned_prices_v{version:05d}.csv")
+
+
+def diff_tables(old, new, key_cols=KEY_COLS):
+    """
+    Compare two versions of a table by key.
+
+    Returns a frame of the new row values with an 'op' column set to
+    'insert' or 'update', plus the old row values for keys that were
+    deleted ('delete').
+    """
+    value_cols = [c for c in new.columns if c not in key_cols]
+    # columns added since the last publish compare as missing in the old table
+    old = old.reindex(columns=new.columns)
+    merged = old.merge(new, on=key_cols, how="outer", suffixes=("_old", ""), indicator=True)
+
+    changed = np.zeros(len(merged), dtype=bool)
+    for col in value_cols:
+        a, b = merged[f"{col}_old"], merged[col]
+        if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+            # ignore last-digit float noise from CSV round trips
+            same = np.isclose(a, b, rtol=FLOAT_RTOL, atol=0.0, equal_nan=True)
+        else:
+            same = ((a == b) | (a.isna() & b.isna())).to_numpy()
+        changed |= ~same
+
+    ops = np.select(
+        [merged["_merge"] == "right_only", merged["_merge"] == "left_only", changed],
+        ["insert", "delete", "update"],
+        default="",
+    )
+    merged["op"] = ops
+
+    # deleted rows carry their last published values
+    deleted = merged["op"] == "delete"
+    for col in value_cols:
+        merged[col] = merged[col].where(~deleted, merged[f"{col}_old"])
+
+    changes = merged[merged["op"] != ""]
+    return changes[["op"] + key_cols + value_cols].reset_index(drop=True)
+
+
+def read_changes(since_version, until_version=None):
+    """
+    All change sets published after `since_version` (up to `until_version`,
+    the current version by default), collapsed to the latest op per key.
+    Returns None when a change set is missing, in which case the consumer
+    has to reload in full.
+    """
+    if until_version is None:
+        until_version = current_version()
+
+    frames = []
+    for version in range(since_version + 1, until_version + 1):
+        path = change_set_path(version)
+        if not os.path.exists(path):
+            return None
+        frames.append(pd.read_csv(path).assign(version=version))
+
+    if not frames:
+        return pd.DataFrame(columns=["op"] + KEY_COLS + ["version"])
+
+    changes = pd.concat(frames, ignore_index=True)
+    return changes.drop_duplicates(KEY_COLS, keep="last")
+
+
+def publish_cleaned(cleaned, cleaned_path):
+    """
+    Diff against the previously published cleaned_prices.csv and publish a
+    change set with a new version number. Nothing is rewritten when the
+    table is unchanged.
+
+    The change set and version are written before the table itself, and the
+    table is swapped in by rename. A run interrupted in between leaves the
+    old table in place, so the next run diffs against it again and publishes
+    the same upserts under a new version; consumers apply them idempotently.
+    """
+    if os.path.exists(cleaned_path):
+        previous = pd.read_csv(cleaned_path, float_precision="round_trip")
+    else:
+        previous = cleaned.iloc[0:0]
+
+    changes = diff_tables(previous, cleaned)
+    if changes.empty:
+        print(f"No changes to {cleaned_path}, still at version {current_version()}")
+        return changes
+
+    version = current_version() + 1
+    os.makedirs(CHANGES_DIR, exist_ok=True)
+    _write_csv(changes, change_set_path(version))
+
+    counts = changes["op"].value_counts().to_dict()
+    _write_json(VERSION_PATH, {
+        "version": version,
+        "published_at": datetime.now().isoformat(timespec="seconds"),
+        "changes": {op: int(n) for op, n in counts.items()},
+    })
+
+    _write_csv(cleaned, cleaned_path)
+    print(f"Published cleaned master table version {version}: {counts}")
+    return changes
+
 
 def main():
     os.makedirs(PROCESSED_DIR, exist_ok=True)
 
     standardized_path = os.path.join(INTERIM_DIR, "standardized_prices.csv")
-    df = pd.read_csv(standardized_path)
+    df = pd.read_csv(standardized_path, float_precision="round_trip")
 
     # Basic sanity cleanup
     df["date"] = pd.to_datetime(df["date"])
     df = df.sort_values(["date", "basket_type", "item_name"])
+    # same text form as the published CSV, so diffs compare like with like
+    df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+
+    # Raw files scraped before the scheduler existed have no provenance columns
+    if "carried_forward" not in df.columns:
+        df["carried_forward"] = False
+    df["carried_forward"] = df["carried_forward"].fillna(False).astype(bool)
+    if "last_scraped" not in df.columns:
+        df["last_scraped"] = df["date"]
+    df["last_scraped"] = df["last_scraped"].fillna(df["date"])
 
     # Select and order columns for the cleaned master table
     cols = [
@@ -33,22 +196,28 @@ def main():
         "price_per_100g",
         "price_per_unit",
         "source_file",
+        "carried_forward",
+        "last_scraped",
     ]
-    cleaned = df[cols].copy()
+    cleaned = df[cols].copy().reset_index(drop=True)
 
     cleaned_path = os.path.join(PROCESSED_DIR, "cleaned_prices.csv")
-    cleaned.to_csv(cleaned_path, index=False)
-    print(f"Saved cleaned master table to {cleaned_path}")
+    publish_cleaned(cleaned, cleaned_path)
 
     # Build canonical mapping: which scraped names map to which canonical item_name
     mapping = (
         cleaned[["item_name", "scraped_name", "brand", "store"]]
         .drop_duplicates()
         .sort_values(["item_name", "scraped_name"])
+        .reset_index(drop=True)
     )
 
+    # One row per scraped name, read by nothing downstream: no change set,
+    # just skip the write when it is unchanged
     mapping_path = os.path.join(PROCESSED_DIR, "canonical_mapping.csv")
-    mapping.to_csv(mapping_path, index=False)
+    if os.path.exists(mapping_path) and pd.read_csv(mapping_path).equals(mapping):
+        return
+    _write_csv(mapping, mapping_path)
     print(f"Saved canonical mapping to {mapping_path}")
 
 
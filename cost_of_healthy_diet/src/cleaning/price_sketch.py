@@ -0,0 +1,131 @@
+import os
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+INTERIM_DIR = os.path.join(PROJECT_ROOT, "data", "interim")
+SKETCH_PATH = os.path.join(INTERIM_DIR, "price_sketches.csv")
+
+# Quantiles come back within this relative error of a true value
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+SKETCH_KEYS = ["date", "basket_type", "item_name"]
+
+
+# A sketch is a plain dict so it serializes straight to JSON:
+#   {"count": n, "zeros": n_non_positive, "min": x, "max": x,
+#    "bins": {bucket_index: count}}
+# Positive values land in bucket ceil(log_gamma(x)); two sketches merge by
+# adding counts bucket by bucket, so the result does not depend on how rows
+# were split across shards or months.
+
+def empty_sketch():
+    return {"count": 0, "zeros": 0, "min": None, "max": None, "bins": {}}
+
+
+def sketch_from_values(values):
+    """
+    Build a sketch from an iterable of prices. NaN values are ignored.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+
+    sketch = empty_sketch()
+    if values.size == 0:
+        return sketch
+
+    positive = values[values > 0]
+    idx, counts = np.unique(np.ceil(np.log(positive) / LOG_GAMMA).astype(int), return_counts=True)
+
+    sketch["count"] = int(values.size)
+    sketch["zeros"] = int(values.size - positive.size)
+    sketch["min"] = float(values.min())
+    sketch["max"] = float(values.max())
+    sketch["bins"] = {int(i): int(c) for i, c in zip(idx, counts)}
+    return sketch
+
+
+def merge_sketches(*sketches):
+    merged = empty_sketch()
+    for s in sketches:
+        if not s["count"]:
+            continue
+        merged["count"] += s["count"]
+        merged["zeros"] += s["zeros"]
+        merged["min"] = s["min"] if merged["min"] is None else min(merged["min"], s["min"])
+        merged["max"] = s["max"] if merged["max"] is None else max(merged["max"], s["max"])
+        for i, c in s["bins"].items():
+            i = int(i)
+            merged["bins"][i] = merged["bins"].get(i, 0) + c
+    return merged
+
+
+def sketch_quantile(sketch, q):
+    """
+    Approximate q-quantile (0 <= q <= 1), or None for an empty sketch.
+    """
+    if not sketch["count"]:
+        return None
+
+    rank = q * (sketch["count"] - 1)
+    if rank < sketch["zeros"]:
+        return 0.0
+
+    seen = sketch["zeros"]
+    for i in sorted(sketch["bins"], key=int):
+        seen += sketch["bins"][i]
+        if seen > rank:
+            # bucket midpoint in the relative-error sense
+            value = 2 * GAMMA ** int(i) / (GAMMA + 1)
+            return min(max(value, sketch["min"]), sketch["max"])
+    return sketch["max"]
+
+
+def build_sketches(df, value_col="price_per_100g"):
+    """
+    One sketch per (date, basket_type, item_name) over `value_col`.
+    """
+    rows = []
+    for key, part in df.groupby(SKETCH_KEYS):
+        sketch = sketch_from_values(part[value_col])
+        rows.append(dict(zip(SKETCH_KEYS, key), sketch=json.dumps(sketch)))
+    return pd.DataFrame(rows, columns=SKETCH_KEYS + ["sketch"])
+
+
+def merge_sketch_frames(*frames):
+    """
+    Combine sketch tables (e.g. from backfill shards) key by key.
+    """
+    df = pd.concat(frames, ignore_index=True)
+    rows = []
+    for key, part in df.groupby(SKETCH_KEYS):
+        merged = merge_sketches(*(json.loads(s) for s in part["sketch"]))
+        rows.append(dict(zip(SKETCH_KEYS, key), sketch=json.dumps(merged)))
+    return pd.DataFrame(rows, columns=SKETCH_KEYS + ["sketch"])
+
+
+def load_sketches(path=SKETCH_PATH):
+    return pd.read_csv(path)
+
+
+def price_quantiles(sketches, item_name, qs=(0.1, 0.5, 0.9), start=None, end=None, basket_type=None):
+    """
+    Quantiles of an item's price distribution over a date range, from the
+    stored sketches alone.
+    """
+    part = sketches[sketches["item_name"] == item_name]
+    if basket_type:
+        part = part[part["basket_type"] == basket_type]
+    if start:
+        part = part[part["date"] >= start]
+    if end:
+        part = part[part["date"] <= end]
+
+    merged = merge_sketches(*(json.loads(s) for s in part["sketch"]))
+    return {q: sketch_quantile(merged, q) for q in qs}
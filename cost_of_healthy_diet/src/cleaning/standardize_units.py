@@ -3,6 +3,8 @@ import re
 import pandas as pd
 import numpy as np
 
+from price_sketch import SKETCH_PATH, build_sketches
+
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 RAW_DIR = os.path.join(PROJECT_ROOT, "data", "raw")
@@ -133,10 +135,12 @@ def load_all_raw():
     return pd.concat(frames, ignore_index=True)
 
 
-def main():
-    os.makedirs(INTERIM_DIR, exist_ok=True)
-
-    df = load_all_raw()
+def standardize(df):
+    """
+    Add unit_value, unit_unit, grams_total, price_per_100g and price_per_unit
+    columns to a frame of raw price rows.
+    """
+    df = df.copy()
 
     # parse unit_size into numeric value and unit
     values = []
@@ -167,10 +171,22 @@ def main():
         np.nan,
     )
 
+    return df
+
+
+def main():
+    os.makedirs(INTERIM_DIR, exist_ok=True)
+
+    df = standardize(load_all_raw())
+
     out_path = os.path.join(INTERIM_DIR, "standardized_prices.csv")
     df.to_csv(out_path, index=False)
     print(f"Saved standardized prices to {out_path}")
 
+    # Mergeable price_per_100g sketches per item, date and basket type
+    build_sketches(df).to_csv(SKETCH_PATH, index=False)
+    print(f"Saved price sketches to {SKETCH_PATH}")
+
 
 if __name__ == "__main__":
     main()
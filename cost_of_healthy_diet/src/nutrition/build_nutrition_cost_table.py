@@ -1,10 +1,19 @@
 import os
+import sys
 import pandas as pd
 import numpy as np
 
+from nutrient_rank_index import update_rank_index
+
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 PROCESSED_DIR = os.path.join(PROJECT_ROOT, "data", "processed")
 
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src", "cleaning"))
+from build_master_table import KEY_COLS, current_version, get_offset, set_offset, read_changes  # noqa: E402
+
+# Name under which this stage records the cleaned_prices version it has applied
+CDC_CONSUMER = "item_nutrition_cost"
+
 
 def compute_nutrient_density(row):
     """
@@ -33,13 +42,7 @@ def compute_nutrient_density(row):
     return beneficial / harmful
 
 
-def main():
-    prices_path = os.path.join(PROCESSED_DIR, "cleaned_prices.csv")
-    nutrition_path = os.path.join(PROCESSED_DIR, "item_nutrition.csv")
-
-    prices = pd.read_csv(prices_path)
-    nutrition = pd.read_csv(nutrition_path)
-
+def build_nutrition_cost(prices, nutrition):
     # Merge on item_name
     df = prices.merge(nutrition, on="item_name", how="left")
 
@@ -82,11 +85,60 @@ def main():
         "cost_per_gram_protein",
     ]
 
-    df_out = df[out_cols].copy()
+    return df[out_cols].copy()
+
+
+def apply_changes(existing, changes, nutrition):
+    """
+    Patch a previous item_nutrition_cost table with a cleaned_prices change
+    set: rows for changed keys are dropped, then inserts and updates are
+    joined with nutrition again.
+    """
+    changed_keys = pd.MultiIndex.from_frame(changes[KEY_COLS])
+    keep = ~pd.MultiIndex.from_frame(existing[KEY_COLS]).isin(changed_keys)
+
+    upserts = changes[changes["op"] != "delete"]
+    fresh = build_nutrition_cost(upserts, nutrition)
+
+    df = pd.concat([existing[keep], fresh], ignore_index=True)
+    return df.sort_values(["date", "basket_type", "item_name"], kind="stable")
+
+
+def main():
+    prices_path = os.path.join(PROCESSED_DIR, "cleaned_prices.csv")
+    nutrition_path = os.path.join(PROCESSED_DIR, "item_nutrition.csv")
     out_path = os.path.join(PROCESSED_DIR, "item_nutrition_cost.csv")
+
+    nutrition = pd.read_csv(nutrition_path)
+
+    # Only consume the cleaned_prices change sets when the previous output is
+    # still valid for the current nutrition table
+    changes = None
+    if os.path.exists(out_path) and os.path.getmtime(out_path) >= os.path.getmtime(nutrition_path):
+        changes = read_changes(get_offset(CDC_CONSUMER))
+
+    if changes is None:
+        df_out = build_nutrition_cost(pd.read_csv(prices_path), nutrition)
+        # every stored ranking may be stale after a full rebuild
+        changed_keys = df_out[["date", "basket_type"]]
+    elif changes.empty:
+        print(f"{out_path} is up to date with cleaned prices version {current_version()}")
+        # the index may still be missing or behind the table
+        update_rank_index(pd.read_csv(out_path))
+        return
+    else:
+        existing = pd.read_csv(out_path, float_precision="round_trip")
+        df_out = apply_changes(existing, changes, nutrition)
+        changed_keys = changes[["date", "basket_type"]]
+        print(f"Applied {len(changes)} cleaned price changes")
+
     df_out.to_csv(out_path, index=False)
+    set_offset(CDC_CONSUMER, current_version())
     print(f"Saved nutrition plus cost table to {out_path}")
 
+    # Rank new dates and re-rank the dates touched by these changes
+    update_rank_index(df_out, changed_keys)
+
 
 if __name__ == "__main__":
     main()
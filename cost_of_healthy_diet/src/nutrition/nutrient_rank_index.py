@@ -0,0 +1,147 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+PROCESSED_DIR = os.path.join(PROJECT_ROOT, "data", "processed")
+INDEX_PATH = os.path.join(PROCESSED_DIR, "item_nutrition_cost_rank.csv")
+
+# metric -> True when lower values rank first
+RANK_METRICS = {
+    "cost_per_100_calories": True,
+    "cost_per_gram_protein": True,
+    "nutrient_density_score": False,
+}
+
+# basket_type label used for the ranking over every basket
+ALL_BASKETS = "All"
+
+INDEX_COLS = ["date", "basket_type", "metric", "rank", "item_name", "store", "value"]
+
+
+def rank_rows(df):
+    """
+    Ranked rows for every (date, basket_type, metric) present in `df`, plus
+    the same rankings across all basket types. Rows with no value are left out.
+    """
+    frames = []
+    scopes = [df, df.assign(basket_type=ALL_BASKETS)]
+
+    for metric, ascending in RANK_METRICS.items():
+        for scope in scopes:
+            part = scope[["date", "basket_type", "item_name", "store", metric]]
+            part = part.dropna(subset=[metric]).rename(columns={metric: "value"})
+            part = part.sort_values(
+                ["date", "basket_type", "value", "item_name"],
+                ascending=[True, True, ascending, True],
+                kind="stable",
+            )
+            part["metric"] = metric
+            part["rank"] = part.groupby(["date", "basket_type"]).cumcount() + 1
+            frames.append(part)
+
+    return pd.concat(frames, ignore_index=True)[INDEX_COLS]
+
+
+def update_rank_index(df, changed_keys=None, index_path=INDEX_PATH):
+    """
+    Bring the stored index in line with `df`.
+
+    Dates missing from the index are ranked and appended to the end of the
+    file. Dates under `changed_keys` (a frame with date and basket_type
+    columns, e.g. a cleaned_prices change set) are re-ranked for every
+    basket and for the 'All' scope, which means rewriting the file. Returns
+    the number of dates ranked.
+    """
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+
+    restated = set()
+    if changed_keys is not None and len(changed_keys):
+        restated = set(pd.to_datetime(changed_keys["date"]).dt.strftime("%Y-%m-%d"))
+
+    exists = os.path.exists(index_path)
+    if exists:
+        stored = pd.read_csv(index_path, usecols=["date"])["date"]
+        seen = set(stored) - restated
+    else:
+        seen = set()
+
+    todo = df[~df["date"].isin(seen)]
+    if todo.empty and not restated:
+        print("Rank index is up to date")
+        return 0
+
+    ranked = rank_rows(todo)
+    if exists and restated & set(stored):
+        # restated dates sit in the middle of the file, so rewrite it
+        kept = pd.read_csv(index_path)
+        kept = kept[~kept["date"].isin(restated)]
+        tmp_path = f"{index_path}.tmp"
+        pd.concat([kept, ranked], ignore_index=True).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, index_path)
+    else:
+        ranked.to_csv(index_path, mode="a", header=not exists, index=False)
+
+    n_dates = todo["date"].nunique()
+    print(f"Ranked {n_dates} dates into rank index {index_path}")
+    return n_dates
+
+
+def load_rank_index(index_path=INDEX_PATH):
+    """
+    Load the stored rankings into sorted arrays keyed by
+    (date, basket_type, metric).
+
+    Each entry holds 'items', 'stores', 'values' in rank order, and 'keys':
+    values arranged ascending (negated for higher-is-better metrics) for
+    binary search, plus an 'item_values' lookup from (item_name, store) to
+    value. An item ranked more than once under the same key (the same item
+    in several baskets, in the 'All' ranking) keeps its best ranked value.
+    """
+    ranked = pd.read_csv(index_path)
+    index = {}
+    for (date, basket, metric), part in ranked.groupby(["date", "basket_type", "metric"], sort=False):
+        values = part["value"].to_numpy()
+        best = part.drop_duplicates(["item_name", "store"], keep="first")
+        index[(date, basket, metric)] = {
+            "items": part["item_name"].to_numpy(),
+            "stores": part["store"].to_numpy(),
+            "values": values,
+            "keys": values if RANK_METRICS[metric] else -values,
+            "item_values": dict(zip(zip(best["item_name"], best["store"]), best["value"])),
+        }
+    return index
+
+
+def top_k(index, date, metric, k=10, basket_type=ALL_BASKETS):
+    """
+    The k best items for a metric on a date as (item_name, store, value).
+    """
+    entry = index.get((date, basket_type, metric))
+    if entry is None:
+        return []
+    return list(zip(entry["items"][:k], entry["stores"][:k], entry["values"][:k]))
+
+
+def rank_of_item(index, date, metric, item_name, store="Walmart", basket_type=ALL_BASKETS):
+    """
+    1-based rank of an item at one store by binary search on its value (ties
+    share the best rank), or None when the item has no value that date.
+    """
+    entry = index.get((date, basket_type, metric))
+    if entry is None or (item_name, store) not in entry["item_values"]:
+        return None
+    value = entry["item_values"][(item_name, store)]
+    key = value if RANK_METRICS[metric] else -value
+    return int(np.searchsorted(entry["keys"], key, side="left")) + 1
+
+
+def main():
+    path = os.path.join(PROCESSED_DIR, "item_nutrition_cost.csv")
+    update_rank_index(pd.read_csv(path))
+
+
+if __name__ == "__main__":
+    main()
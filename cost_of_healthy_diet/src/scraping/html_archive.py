@@ -0,0 +1,126 @@
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+
+try:
+    import zstandard
+except ImportError:  # fall back to zlib, recorded per blob
+    zstandard = None
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+ARCHIVE_DIR = os.path.join(PROJECT_ROOT, "data", "raw", "html_archive")
+
+# Compressed pages are appended to BLOB_FILE; INDEX_FILE maps
+# (store, query, date) -> page hash -> (offset, length) in the blob file.
+BLOB_FILE = "pages.bin"
+INDEX_FILE = "index.sqlite"
+
+ZSTD_LEVEL = 10
+
+
+def compress(data):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+
+def decompress(codec, data):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Archive contains zstd pages but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def open_archive(archive_dir=ARCHIVE_DIR):
+    os.makedirs(archive_dir, exist_ok=True)
+    con = sqlite3.connect(os.path.join(archive_dir, INDEX_FILE))
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256   TEXT PRIMARY KEY,
+            offset   INTEGER NOT NULL,
+            length   INTEGER NOT NULL,
+            codec    TEXT NOT NULL,
+            raw_size INTEGER NOT NULL
+        )
+        """
+    )
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS snapshots (
+            store      TEXT NOT NULL,
+            query      TEXT NOT NULL,
+            date       TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            sha256     TEXT NOT NULL REFERENCES blobs (sha256),
+            PRIMARY KEY (store, query, date)
+        )
+        """
+    )
+    con.commit()
+    return con
+
+
+def archive_page(con, html, store, query, date, archive_dir=ARCHIVE_DIR):
+    """
+    Store a fetched page. Identical pages are stored once; the snapshot row
+    for (store, query, date) always points at the latest fetch.
+    """
+    raw = html.encode("utf-8")
+    sha = hashlib.sha256(raw).hexdigest()
+
+    known = con.execute("SELECT 1 FROM blobs WHERE sha256 = ?", [sha]).fetchone()
+    if not known:
+        codec, blob = compress(raw)
+        with open(os.path.join(archive_dir, BLOB_FILE), "ab") as f:
+            offset = f.tell()
+            f.write(blob)
+        con.execute(
+            "INSERT INTO blobs VALUES (?, ?, ?, ?, ?)",
+            [sha, offset, len(blob), codec, len(raw)],
+        )
+
+    con.execute(
+        "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+        [store, query, date, time.time(), sha],
+    )
+    con.commit()
+    return sha
+
+
+def list_snapshots(con, start=None, end=None):
+    """
+    Snapshot rows joined to their blob locations, ordered by date.
+    """
+    query = """
+        SELECT s.store, s.query, s.date, b.offset, b.length, b.codec
+        FROM snapshots s JOIN blobs b ON s.sha256 = b.sha256
+        WHERE (? IS NULL OR s.date >= ?) AND (? IS NULL OR s.date <= ?)
+        ORDER BY s.date, s.store, s.query
+    """
+    return con.execute(query, [start, start, end, end]).fetchall()
+
+
+def read_blob(offset, length, codec, archive_dir=ARCHIVE_DIR):
+    with open(os.path.join(archive_dir, BLOB_FILE), "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    return decompress(codec, data).decode("utf-8")
+
+
+def read_page(con, store, query, date, archive_dir=ARCHIVE_DIR):
+    row = con.execute(
+        """
+        SELECT b.offset, b.length, b.codec
+        FROM snapshots s JOIN blobs b ON s.sha256 = b.sha256
+        WHERE s.store = ? AND s.query = ? AND s.date = ?
+        """,
+        [store, query, date],
+    ).fetchone()
+    if row is None:
+        return None
+    return read_blob(*row, archive_dir=archive_dir)
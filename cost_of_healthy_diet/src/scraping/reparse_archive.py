@@ -0,0 +1,97 @@
+import os
+import csv
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from html_archive import ARCHIVE_DIR, open_archive, list_snapshots, read_blob
+from scrape_prices import parse_walmart_product, product_record, save_results
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+RAW_DIR = os.path.join(PROJECT_ROOT, "data", "raw")
+
+PARSERS = {
+    "Walmart": parse_walmart_product,
+}
+
+
+def parse_snapshot(snapshot):
+    """
+    Worker: decompress one archived page and run it through today's parser.
+    """
+    store, query, date, offset, length, codec, archive_dir = snapshot
+    html = read_blob(offset, length, codec, archive_dir=archive_dir)
+    return store, query, date, PARSERS[store](html)
+
+
+def merge_existing(records, out_dir):
+    """
+    Fold re-parsed records into the raw file already saved for their date.
+
+    Rows are matched on (basket_type, item_name): re-parsed rows replace the
+    stored ones in place, and stored rows with no archived page (carried
+    forward items, or items whose page no longer parses) are kept as is.
+    """
+    date_str = records[0]["date"].replace("-", "")
+    path = os.path.join(out_dir, f"raw_prices_{date_str}.csv")
+    if not os.path.exists(path):
+        return records
+
+    reparsed = {(r["basket_type"], r["item_name"]): r for r in records}
+    with open(path, newline="", encoding="utf-8") as f:
+        existing = list(csv.DictReader(f))
+
+    merged = []
+    for row in existing:
+        key = (row["basket_type"], row["item_name"])
+        merged.append(reparsed.pop(key, row))
+    merged.extend(reparsed.values())
+    return merged
+
+
+def reparse(start=None, end=None, out_dir=RAW_DIR, processes=None, archive_dir=ARCHIVE_DIR):
+    """
+    Regenerate raw_prices_<date>.csv files for every archived date in
+    [start, end] from the stored HTML, merged into any raw file already
+    saved for that date.
+    """
+    con = open_archive(archive_dir)
+    snapshots = [row + (archive_dir,) for row in list_snapshots(con, start, end)]
+    con.close()
+
+    if not snapshots:
+        print("No archived pages in range")
+        return
+
+    basket_df = pd.read_csv(os.path.join(PROJECT_ROOT, "basket_items.csv"))
+    baskets_by_item = basket_df.groupby("item_name")["basket_type"].apply(list).to_dict()
+
+    by_date = {}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for store, query, date, product in pool.map(parse_snapshot, snapshots, chunksize=16):
+            if product is None:
+                print(f"{date} {store} '{query}': parser found no product")
+                continue
+            # one page can feed several baskets, as in scrape_all
+            for basket in baskets_by_item.get(query, []):
+                by_date.setdefault(date, []).append(product_record(product, basket, query, date))
+
+    for date in sorted(by_date):
+        save_results(merge_existing(by_date[date], out_dir), out_dir=out_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-parse archived HTML into raw price files")
+    parser.add_argument("--start", help="first date, YYYY-MM-DD")
+    parser.add_argument("--end", help="last date, YYYY-MM-DD")
+    parser.add_argument("--out-dir", default=RAW_DIR)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    reparse(args.start, args.end, out_dir=args.out_dir, processes=args.processes)
+
+
+if __name__ == "__main__":
+    main()
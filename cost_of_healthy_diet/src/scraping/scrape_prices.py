@@ -2,14 +2,19 @@ import os
 import time
 import random
 import csv
+import argparse
 from datetime import datetime
 
 import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 
+from scrape_scheduler import REQUEST_BUDGET, plan_scrape, carry_forward_records
+from html_archive import open_archive, archive_page
+
 
 BASE_URL = "https://www.walmart.com/search"
+STORE = "Walmart"
 
 
 def load_basket_items(path):
@@ -82,55 +87,79 @@ def parse_walmart_product(html):
     }
 
 
-def scrape_item(item):
+def scrape_item(item, archive=None, date=None):
+    """
+    Fetch and parse one item. When an archive connection is given, the page
+    is stored before parsing so it can be re-parsed later.
+    """
     try:
         html = fetch_page(item)
+        if archive is not None:
+            archive_page(archive, html, STORE, item, date)
         return parse_walmart_product(html)
     except Exception as e:
         print(f"Error while scraping {item}: {e}")
         return None
 
 
-def scrape_all(basket_df):
+def scrape_all(basket_df, budget=None):
+    """
+    Scrape basket items. With a request budget, only the highest priority
+    items from the scheduler are fetched and the rest carry their last
+    scraped price forward.
+    """
     today = datetime.today().strftime("%Y-%m-%d")
     results = []
 
-    for _, row in basket_df.iterrows():
-        item = row["item_name"]
-        basket = row["basket_type"]
+    if budget is not None:
+        basket_df, carry_forward = plan_scrape(basket_df, budget=budget)
+        results.extend(carry_forward_records(carry_forward, today))
+        print(f"Scraping {len(basket_df)} items, carrying forward {len(carry_forward)}")
 
-        print(f"Scraping: {item}")
+    archive = open_archive()
+    try:
+        for _, row in basket_df.iterrows():
+            item = row["item_name"]
+            basket = row["basket_type"]
 
-        product = scrape_item(item)
+            print(f"Scraping: {item}")
 
-        if product is None:
-            print(f"Skipping {item}, no data found")
-            continue
+            product = scrape_item(item, archive=archive, date=today)
 
-        results.append({
-            "date": today,
-            "basket_type": basket,
-            "item_name": item,
-            "scraped_name": product["scraped_name"],
-            "price": product["price"],
-            "unit_size": product["unit_size"],
-            "brand": product["brand"],
-            "store": "Walmart",
-        })
+            if product is None:
+                print(f"Skipping {item}, no data found")
+                continue
 
-        # Polite delay
-        time.sleep(random.uniform(2.5, 4.0))
+            results.append(product_record(product, basket, item, today))
 
+            # Polite delay
+            time.sleep(random.uniform(2.5, 4.0))
+    finally:
+        archive.close()
     return results
 
 
-def save_results(records):
+def product_record(product, basket, item, date):
+    return {
+        "date": date,
+        "basket_type": basket,
+        "item_name": item,
+        "scraped_name": product["scraped_name"],
+        "price": product["price"],
+        "unit_size": product["unit_size"],
+        "brand": product["brand"],
+        "store": STORE,
+        "carried_forward": False,
+        "last_scraped": date,
+    }
+
+
+def save_results(records, out_dir="cost_of_healthy_diet/data/raw/"):
     if not records:
         print("No data to save")
         return
 
     date_str = records[0]["date"].replace("-", "")
-    out_dir = "cost_of_healthy_diet/data/raw/"
     os.makedirs(out_dir, exist_ok=True)
 
     filename = f"raw_prices_{date_str}.csv"
@@ -138,7 +167,8 @@ def save_results(records):
 
     fields = [
         "date", "basket_type", "item_name", "scraped_name",
-        "price", "unit_size", "brand", "store"
+        "price", "unit_size", "brand", "store",
+        "carried_forward", "last_scraped",
     ]
 
     with open(path, "w", newline="", encoding="utf-8") as f:
@@ -159,14 +189,28 @@ def main():
     print("Looking for basket_items.csv at:", basket_path)
 
     basket_df = load_basket_items(basket_path)
-    records = scrape_all(basket_df)
-    save_results(records)
+    records = scrape_all(basket_df, budget=REQUEST_BUDGET)
+    save_results(records, out_dir=raw_dir)
 
 
-if __name__ == "__main__":
-    query = "Whole Wheat Bread"
+def debug_query(query):
+    """
+    Fetch one search page, save its HTML in the working directory and show what
+    the parser makes of it.
+    """
     html = fetch_page(query)
     debug_save_html(html, query)
     parsed = parse_walmart_product(html)
     print("Parsed product:", parsed)
 
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape basket item prices")
+    parser.add_argument("--debug", metavar="QUERY", help="fetch and parse a single query, e.g. 'Whole Wheat Bread'")
+    args = parser.parse_args()
+
+    if args.debug:
+        debug_query(args.debug)
+    else:
+        main()
+
@@ -0,0 +1,160 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+RAW_DIR = os.path.join(PROJECT_ROOT, "data", "raw")
+PROCESSED_DIR = os.path.join(PROJECT_ROOT, "data", "processed")
+
+# Max number of store requests per scrape run
+REQUEST_BUDGET = 20
+
+# Items not scraped for this long jump the queue, however stable they look
+# (still within REQUEST_BUDGET; overdue items beyond it wait for the next run)
+MAX_STALENESS_DAYS = 90
+
+# Volatility (std of monthly % change) assumed for items with too little history
+DEFAULT_VOLATILITY = 5.0
+
+KEY_COLS = ["basket_type", "item_name"]
+
+
+def load_volatility():
+    """
+    Historical price volatility per (basket_type, item_name), taken as the
+    standard deviation of the month over month cost_change_pct in
+    item_inflation.csv.
+    """
+    path = os.path.join(PROCESSED_DIR, "item_inflation.csv")
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=KEY_COLS + ["volatility"])
+
+    df = pd.read_csv(path)
+    vol = (
+        df.groupby(KEY_COLS)["cost_change_pct"]
+        .std()
+        .rename("volatility")
+        .reset_index()
+    )
+    return vol
+
+
+def load_last_seen():
+    """
+    Most recent raw row per item across all raw files, with the date its
+    price was last actually scraped (carried forward rows keep the date of
+    the original scrape).
+
+    Rows are ordered by their date column rather than by file name, since
+    monthly (YYYYMM) and daily (YYYYMMDD) file names do not sort together.
+    """
+    files = [
+        f for f in os.listdir(RAW_DIR)
+        if f.startswith("raw_prices_") and f.endswith(".csv")
+    ]
+    if not files:
+        return pd.DataFrame(columns=KEY_COLS + ["last_scraped"])
+
+    frames = []
+    for fname in files:
+        df = pd.read_csv(os.path.join(RAW_DIR, fname))
+        if "last_scraped" not in df.columns:
+            df["last_scraped"] = df["date"]
+        df["last_scraped"] = df["last_scraped"].fillna(df["date"])
+        frames.append(df)
+
+    raw = pd.concat(frames, ignore_index=True)
+    raw["date"] = pd.to_datetime(raw["date"])
+    raw = raw.sort_values("date", kind="stable")
+    latest = raw.drop_duplicates(KEY_COLS, keep="last").copy()
+    latest["date"] = latest["date"].dt.strftime("%Y-%m-%d")
+    return latest
+
+
+def score_items(basket_df, today=None):
+    """
+    Attach a priority to every basket item.
+
+    The expected size of the price move since the last scrape grows like a
+    random walk: volatility * sqrt(months since last scrape). Items never
+    scraped, or older than MAX_STALENESS_DAYS, get infinite priority.
+
+    Rows are sorted by priority, then volatility, then age (never scraped
+    counts as oldest), so overdue items are ordered among themselves too.
+    """
+    today = pd.Timestamp(today or datetime.today().date())
+
+    scored = basket_df.merge(load_volatility(), on=KEY_COLS, how="left")
+    last = load_last_seen()[KEY_COLS + ["last_scraped"]]
+    scored = scored.merge(last, on=KEY_COLS, how="left")
+
+    scored["volatility"] = scored["volatility"].fillna(DEFAULT_VOLATILITY)
+    age_days = (today - pd.to_datetime(scored["last_scraped"])).dt.days
+    scored["age_days"] = age_days
+
+    months = age_days.clip(lower=0) / 30.0
+    scored["priority"] = scored["volatility"] * np.sqrt(months)
+
+    overdue = age_days.isna() | (age_days >= MAX_STALENESS_DAYS)
+    scored.loc[overdue, "priority"] = np.inf
+
+    order = scored.assign(_age=age_days.fillna(np.inf)).sort_values(
+        ["priority", "volatility", "_age"], ascending=False, kind="stable"
+    )
+    return order.drop(columns="_age")
+
+
+def plan_scrape(basket_df, budget=REQUEST_BUDGET, today=None):
+    """
+    Split the basket into items to scrape this run and items to carry forward.
+
+    Returns (to_scrape, carry_forward) where to_scrape holds the `budget`
+    highest priority basket rows and carry_forward holds the previous raw
+    rows for the remaining items. The budget is a hard cap: when more items
+    are overdue than fit, the most volatile and then the oldest go first and
+    the rest are carried forward one more run.
+    """
+    scored = score_items(basket_df, today=today)
+    to_scrape = scored.head(budget)
+    skipped = scored.iloc[budget:][KEY_COLS]
+
+    carry_forward = skipped.merge(load_last_seen(), on=KEY_COLS, how="inner")
+    return to_scrape[basket_df.columns], carry_forward
+
+
+def carry_forward_records(carry_forward, date):
+    """
+    Turn previous raw rows into records for `date`, marked as carried forward.
+    """
+    records = []
+    for _, row in carry_forward.iterrows():
+        records.append({
+            "date": date,
+            "basket_type": row["basket_type"],
+            "item_name": row["item_name"],
+            "scraped_name": row["scraped_name"],
+            "price": row["price"],
+            "unit_size": row["unit_size"],
+            "brand": row["brand"],
+            "store": row["store"],
+            "carried_forward": True,
+            "last_scraped": row["last_scraped"],
+        })
+    return records
+
+
+def main():
+    basket_path = os.path.join(PROJECT_ROOT, "basket_items.csv")
+    basket_df = pd.read_csv(basket_path)
+
+    scored = score_items(basket_df)
+    cols = KEY_COLS + ["volatility", "age_days", "priority"]
+    print(scored[cols].to_string(index=False))
+    print(f"\nTop {REQUEST_BUDGET} items would be scraped this run")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,56 +13,62 @@ INFLATION = {
     2025: {"Healthy": 0.0020, "UltraProcessed": 0.0020, "Neutral": 0.0020},
 }
 
-def simulate_multiyear(input_csv, output_dir, start_year=2020, end_year=2025):
-    df = pd.read_csv(input_csv)
+BASKETS = ["Healthy", "UltraProcessed", "Neutral"]
 
-    os.makedirs(output_dir, exist_ok=True)
 
-    # baseline is Jan 2025 — we simulate backwards
-    baseline_prices = df.copy()
+def simulate_month(baseline_df, year, month, end_year=2025, rng=np.random):
+    """
+    Simulate one month of prices from the baseline, independent of the other
+    months so months can be generated separately (see src/backfill).
 
-    for year in range(end_year, start_year - 1, -1):
-        for month in reversed(range(1, 13)):
-            inflation = INFLATION[year]
+    Prices in `year` are the baseline deflated by every later year's rate
+    plus this year's rate, times 1% noise.
+    """
+    month_df = baseline_df.copy()
+    month_date = datetime(year, month, 1)
+    month_df["date"] = month_date.strftime("%Y-%m-%d")
+
+    for basket in BASKETS:
+        mask = month_df["basket_type"] == basket
 
-            # Copy baseline
-            month_df = baseline_prices.copy()
-            month_date = datetime(year, month, 1)
-            month_df["date"] = month_date.strftime("%Y-%m-%d")
+        # deflation accumulated from the years after this one
+        deflation = 1.0
+        for later in range(year + 1, end_year + 1):
+            deflation /= 1 + INFLATION[later][basket]
 
-            # Apply inflation (reverse annual drift)
-            for basket in ["Healthy", "UltraProcessed", "Neutral"]:
-                mask = month_df["basket_type"] == basket
+        rate = INFLATION[year][basket]
+        # reverse direction for backward simulation
+        backward_factor = deflation / (1 + rate)
 
-                rate = inflation[basket]
-                # reverse direction for backward simulation
-                backward_factor = 1 / (1 + rate)
+        # noise to make it more realistic
+        noise = rng.normal(1.0, 0.01, size=mask.sum())
 
-                # noise to make it more realistic
-                noise = np.random.normal(1.0, 0.01, size=mask.sum())
+        month_df.loc[mask, "price"] = (
+            month_df.loc[mask, "price"] * backward_factor * noise
+        )
 
-                month_df.loc[mask, "price"] = (
-                    month_df.loc[mask, "price"] * backward_factor * noise
-                )
+    # round
+    month_df["price"] = month_df["price"].round(2)
+    return month_df
 
-            # round
-            month_df["price"] = month_df["price"].round(2)
+
+def simulate_multiyear(input_csv, output_dir, start_year=2020, end_year=2025):
+    df = pd.read_csv(input_csv)
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    # baseline is Jan 2025 — we simulate backwards
+    for year in range(end_year, start_year - 1, -1):
+        for month in reversed(range(1, 13)):
+            month_df = simulate_month(df, year, month, end_year=end_year)
 
             # Save file
-            file_name = f"raw_prices_{month_date.strftime('%Y%m')}.csv"
+            file_name = f"raw_prices_{year}{month:02d}.csv"
             out_path = os.path.join(output_dir, file_name)
             month_df.to_csv(out_path, index=False)
 
             print(f"Saved {out_path}")
 
-        # Prepare next year's baseline by applying larger backward deflation
-        for basket in ["Healthy", "UltraProcessed", "Neutral"]:
-            mask = baseline_prices["basket_type"] == basket
-            rate = INFLATION[year][basket]
-            baseline_prices.loc[mask, "price"] = (
-                baseline_prices.loc[mask, "price"] / (1 + rate)
-            )
-
 
 def main():
     project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))